@@ -1,6 +1,7 @@
 from flask import Flask, render_template_string, request, redirect, url_for, session, jsonify
-import hashlib, json, os, random
+import hashlib, json, os, random, struct
 from collections import deque
+from functools import lru_cache
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'openfront_dev_key_CHANGE_IN_PROD')
@@ -12,6 +13,10 @@ os.makedirs(SAVES_DIR, exist_ok=True)
 
 MAP_SIZE = 40  # Réduit pour de meilleures perfs
 CELL_SIZE = 16  # Plus gros pour mieux voir
+FOG_OF_WAR = os.environ.get('FOG_OF_WAR', '0') == '1'  # Brouillard de guerre (FOG_OF_WAR=1 pour l'activer)
+VISION_RANGE = 3  # Portée de vision (en pas) autour du territoire
+HISTORY_SIZE = 20  # Événements gardés dans la sauvegarde, les plus anciens vont dans le fichier d'événements
+HISTORY_PAGE = 20  # Événements par page de /api/history
 COLORS = ["#FF0000", "#4ECDC4", "#45B7D1", "#FFA07A", "#98D8C8", "#F7DC6F", "#BB8FCE", "#85C1E2", "#F8B739", "#52BE80"]
 BOT_NAMES = ["Empire Rouge", "Royaume Bleu", "Nation Verte", "Alliance Jaune", "Confédération Violette", 
              "Coalition Orange", "Fédération Rose", "Union Turquoise", "République Cyan", "Ligue Magenta"]
@@ -92,15 +97,19 @@ def init_game(username):
         ownership[by][bx] = i+1
         troops_per_cell[f"{bx},{by}"] = 100
     
-    return {
+    game = {
         "terrain": terrain,
         "ownership": ownership,
         "players": players,
         "cities": cities,
         "troops": troops_per_cell,
         "turn": 0,
-        "history": []
+        "history": [],
+        "game_id": os.urandom(4).hex(),
+        "next_event_id": 0
     }
+    init_visibility(game)
+    return game
 
 def get_neighbors(x, y):
     neighbors = []
@@ -110,6 +119,149 @@ def get_neighbors(x, y):
             neighbors.append((nx, ny))
     return neighbors
 
+# ================== VISIBILITÉ ==================
+# Une bitmap (int) par joueur : bit y*MAP_SIZE+x = case visible.
+def _diamond(radius):
+    return [(dx, dy) for dy in range(-radius, radius+1) for dx in range(-radius, radius+1) if abs(dx) + abs(dy) <= radius]
+
+VISION_OFFSETS = _diamond(VISION_RANGE)
+RECHECK_OFFSETS = _diamond(2 * VISION_RANGE)
+
+@lru_cache(maxsize=None)
+def vision_mask(x, y):
+    """Cases à VISION_RANGE pas ou moins de (x, y)"""
+    mask = 0
+    for dx, dy in VISION_OFFSETS:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < MAP_SIZE and 0 <= ny < MAP_SIZE:
+            mask |= 1 << (ny * MAP_SIZE + nx)
+    return mask
+
+def init_visibility(game):
+    """Calcul complet (nouvelle partie ou ancienne sauvegarde)"""
+    game['visibility'] = [0] * len(game['players'])
+    for y in range(MAP_SIZE):
+        for x in range(MAP_SIZE):
+            owner = game['ownership'][y][x]
+            if owner != -1:
+                game['visibility'][owner] |= vision_mask(x, y)
+
+def reveal_around(game, player_id, x, y):
+    """Dilatation autour d'une case gagnée"""
+    game['visibility'][player_id] |= vision_mask(x, y)
+
+def hide_around(game, player_id, x, y):
+    """Recalcul local après la perte d'une case : seules les cases du joueur à 2*VISION_RANGE pas comptent"""
+    mask = game['visibility'][player_id] & ~vision_mask(x, y)
+    for dx, dy in RECHECK_OFFSETS:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < MAP_SIZE and 0 <= ny < MAP_SIZE and game['ownership'][ny][nx] == player_id:
+            mask |= vision_mask(nx, ny)
+    game['visibility'][player_id] = mask
+
+def sees(game, player_id, x, y):
+    """Bitmap seule, que le brouillard soit activé ou non"""
+    return (game['visibility'][player_id] >> (y * MAP_SIZE + x)) & 1 == 1
+
+def is_visible(game, player_id, x, y):
+    return not FOG_OF_WAR or sees(game, player_id, x, y)
+
+# ================== HISTORIQUE ==================
+# Événements compacts {id, type, actor, cell, turn, seen} ; le texte n'est produit qu'à l'affichage.
+# 'seen' : le joueur voyait la case au moment de l'événement (figé, ne suit pas le brouillard actuel).
+EVENT_TEXTS = {
+    "conquest": "⚔️ {name} conquiert ({x},{y})",
+    "city": "🏰 {name} construit une ville en ({x},{y})",
+}
+
+def trim_history(game):
+    """Au-delà de HISTORY_SIZE, les plus anciens événements partent dans 'spilled'"""
+    overflow = len(game['history']) - HISTORY_SIZE
+    if overflow > 0:
+        game.setdefault('spilled', []).extend(game['history'][:overflow])
+        del game['history'][:overflow]
+
+def log_event(game, event_type, actor, x, y):
+    seen = actor == 0 or sees(game, 0, x, y)
+    game['history'].append({"id": game['next_event_id'], "type": event_type, "actor": actor, "cell": [x, y], "turn": game['turn'], "seen": seen})
+    game['next_event_id'] += 1
+    trim_history(game)
+
+def format_event(game, event):
+    if event['type'] == 'text':  # Ancienne sauvegarde
+        return event['text']
+    x, y = event['cell']
+    return EVENT_TEXTS[event['type']].format(name=game['players'][event['actor']]['name'], x=x, y=y)
+
+def event_visible(event):
+    return not FOG_OF_WAR or event.get('seen', True)
+
+# Index à côté du fichier d'événements : un enregistrement (id, position) par ligne
+INDEX_RECORD = struct.Struct('<QQ')
+
+def events_file(user, game):
+    return os.path.join(SAVES_DIR, f"{user}_{game['game_id']}_events.jsonl")
+
+def events_index_file(user, game):
+    return os.path.join(SAVES_DIR, f"{user}_{game['game_id']}_events.idx")
+
+def append_events(user, game, events):
+    if os.path.exists(events_file(user, game)) and not os.path.exists(events_index_file(user, game)):
+        rebuild_events_index(user, game)  # Sinon l'index ne couvrirait que les nouvelles lignes
+    with open(events_file(user, game), 'ab') as fh, open(events_index_file(user, game), 'ab') as ih:
+        fh.seek(0, os.SEEK_END)
+        for e in events:
+            ih.write(INDEX_RECORD.pack(e['id'], fh.tell()))
+            fh.write((json.dumps(e, ensure_ascii=False) + "\n").encode('utf-8'))
+
+def rebuild_events_index(user, game):
+    """Fichier d'événements écrit avant l'index"""
+    with open(events_file(user, game), 'rb') as fh, open(events_index_file(user, game), 'wb') as ih:
+        offset = 0
+        for line in fh:
+            ih.write(INDEX_RECORD.pack(json.loads(line)['id'], offset))
+            offset += len(line)
+
+def read_spilled_events(user, game, before, count):
+    """Jusqu'à count événements d'id < before du fichier, du plus ancien au plus récent (seules ces lignes sont lues)"""
+    f, idx = events_file(user, game), events_index_file(user, game)
+    if not os.path.exists(f):
+        return []
+    if not os.path.exists(idx):
+        rebuild_events_index(user, game)
+    with open(idx, 'rb') as ih:
+        lo, hi = 0, os.path.getsize(idx) // INDEX_RECORD.size
+        while lo < hi:  # Premier enregistrement d'id >= before
+            mid = (lo + hi) // 2
+            ih.seek(mid * INDEX_RECORD.size)
+            if INDEX_RECORD.unpack(ih.read(INDEX_RECORD.size))[0] < before:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = max(0, lo - count)
+        if start == lo:
+            return []
+        ih.seek(start * INDEX_RECORD.size)
+        offset = INDEX_RECORD.unpack(ih.read(INDEX_RECORD.size))[1]
+    with open(f, 'rb') as fh:
+        fh.seek(offset)
+        return [json.loads(fh.readline()) for _ in range(lo - start)]
+
+def get_history_page(user, game, before=None, limit=HISTORY_PAGE):
+    """Événements visibles d'id < before, du plus récent au plus ancien.
+    Lève OSError, ValueError ou struct.error si le fichier d'événements est illisible."""
+    if before is None:
+        before = game['next_event_id']
+    page = [e for e in reversed(game['history']) if e['id'] < before and event_visible(e)][:limit]
+    cursor = min([before] + [e['id'] for e in game['history']])
+    while len(page) < limit:
+        chunk = read_spilled_events(user, game, cursor, limit)
+        if not chunk:
+            break
+        page += [e for e in reversed(chunk) if event_visible(e)][:limit - len(page)]
+        cursor = chunk[0]['id']
+    return page, (page[-1]['id'] if len(page) == limit else None)
+
 def get_player_territories(game, player_id):
     """Retourne les territoires d'un joueur (optimisé)"""
     territories = []
@@ -198,15 +350,16 @@ def perform_attack(game, attacker_id, fx, fy, tx, ty, troops):
     if attack_power > defense_power:
         # Victoire
         game['ownership'][ty][tx] = attacker_id
+        log_event(game, "conquest", attacker_id, tx, ty)  # Avant la mise à jour de la visibilité : témoins d'avant l'attaque
+        reveal_around(game, attacker_id, tx, ty)
+        if defender_id != -1:
+            hide_around(game, defender_id, tx, ty)
         game['troops'][from_key] = max(0, game['troops'].get(from_key, 0) - int(attacker_troops * 0.4))
         game['troops'][to_key] = int(attacker_troops * 0.6)
         
         # Supprimer ville ennemie
         if to_key in game['cities'] and game['cities'][to_key]['owner'] != attacker_id:
             del game['cities'][to_key]
-        
-        attacker_name = game['players'][attacker_id]['name']
-        game['history'].append(f"⚔️ {attacker_name} conquiert ({tx},{ty})")
     else:
         # Défaite
         game['troops'][from_key] = max(0, game['troops'].get(from_key, 0) - int(attacker_troops * 0.7))
@@ -217,15 +370,32 @@ def load_game(user):
     try:
         f = os.path.join(SAVES_DIR, f"{user}_game.json")
         if os.path.exists(f):
-            return json.load(open(f, encoding='utf-8'))
+            game = json.load(open(f, encoding='utf-8'))
+            if len(game.get('visibility', [])) != len(game['players']):
+                init_visibility(game)
+            else:
+                game['visibility'] = [int(m, 16) if isinstance(m, str) else m for m in game['visibility']]
+            if 'game_id' not in game:
+                # Ancien historique en texte : tour inconnu, sauvegardé tout de suite pour fixer game_id et le fichier d'événements
+                game['history'] = [{"id": i, "type": "text", "text": t, "turn": None} for i, t in enumerate(game['history'])]
+                game['game_id'] = os.urandom(4).hex()
+                game['next_event_id'] = len(game['history'])
+                trim_history(game)
+                save_game_to_file(user, game)
+            return game
     except:
         pass
     return init_game(user)
 
 def save_game_to_file(user, data):
     try:
+        spilled = data.pop('spilled', [])
+        if spilled:
+            append_events(user, data, spilled)
         f = os.path.join(SAVES_DIR, f"{user}_game.json")
-        json.dump(data, open(f, 'w', encoding='utf-8'), ensure_ascii=False, indent=2)
+        # Bitmaps en hexadécimal : json refuse les entiers de plus de 4300 chiffres (grandes cartes)
+        saved = {**data, 'visibility': [format(m, 'x') for m in data['visibility']]}
+        json.dump(saved, open(f, 'w', encoding='utf-8'), ensure_ascii=False, indent=2)
     except:
         pass
 
@@ -268,6 +438,7 @@ body {
     transition: all 0.2s;
     position: relative;
 }}
+.cell.fog {{ background-color: #2b2b2b; cursor: default; }}
 .cell:hover {{
     transform: scale(1.2);
     z-index: 10;
@@ -428,11 +599,16 @@ def game():
     map_html = ""
     for y in range(MAP_SIZE):
         for x in range(MAP_SIZE):
+            if not is_visible(game_state, 0, x, y):
+                map_html += '<div class="cell fog"></div>'
+                continue
+            
             terrain_type = "sea" if game_state['terrain'][y][x] == 0 else "land"
             owner = game_state['ownership'][y][x]
             color = game_state['players'][owner]['color'] if owner != -1 else ("#1e3a8a" if terrain_type == "sea" else "#22c55e")
             
             city_class = "city" if f"{x},{y}" in game_state['cities'] else ""
+            mine_class = "mine" if owner == 0 else ""
             troops = game_state['troops'].get(f"{x},{y}", 0)
             troop_display = f'<span class="troop-count">{troops}</span>' if owner != -1 and troops > 0 else ""
             
@@ -441,13 +617,14 @@ def game():
             if owner == 0 and (x, y) == get_player_territories(game_state, 0)[0]:
                 label = f'<div style="position:absolute;top:-18px;left:50%;transform:translateX(-50%);white-space:nowrap;font-size:10px;font-weight:bold;color:white;text-shadow:0 0 3px black;">{player["name"]}</div>'
             
-            map_html += f'<div class="cell {terrain_type} {city_class}" style="background-color:{color};position:relative;" onclick="selectCell({x},{y})">{troop_display}{label}</div>'
+            map_html += f'<div class="cell {terrain_type} {city_class} {mine_class}" style="background-color:{color};position:relative;" onclick="selectCell({x},{y})">{troop_display}{label}</div>'
     
     # Classement
     players_sorted = sorted(game_state['players'], key=lambda p: len(get_player_territories(game_state, p['id'])), reverse=True)
     
     # Historique
-    history_html = "<br>".join(game_state['history'][-6:])
+    recent = [e for e in game_state['history'] if event_visible(e)][-6:]
+    history_html = "<br>".join(format_event(game_state, e) for e in recent)
     
     return render_template_string(BASE_STYLE + """
     <body>
@@ -596,6 +773,8 @@ def api_select():
     data = request.json
     x, y = data['x'], data['y']
     game = load_game(session['username'])
+    if not is_visible(game, 0, x, y):
+        return jsonify({"message": "🌫️ Zone inconnue"})
     owner = game['ownership'][y][x]
     
     if owner == 0:
@@ -647,7 +826,7 @@ def api_build_city():
     
     player['gold'] -= 300
     game['cities'][city_key] = {"owner": 0}
-    game['history'].append(f"🏰 {player['name']} construit une ville en ({x},{y})")
+    log_event(game, "city", 0, x, y)
     save_game_to_file(session['username'], game)
     
     return jsonify({"success": True, "message": "✅ Ville construite !"})
@@ -685,12 +864,27 @@ def api_next_turn():
         if game['players'][i]['is_bot']:
             bot_ai(game, i)
     
-    # Limiter l'historique
-    game['history'] = game['history'][-20:]
-    
     save_game_to_file(session['username'], game)
     return jsonify({"message": f"✅ Tour {game['turn']} terminé ! Les bots ont joué."})
 
+@app.route("/api/history")
+def api_history():
+    if 'username' not in session:
+        return jsonify({"message": "❌ Non connecté"}), 401
+    
+    before = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE, type=int), 100))
+    game = load_game(session['username'])
+    try:
+        events, next_before = get_history_page(session['username'], game, before, limit)
+    except (OSError, ValueError, struct.error):
+        return jsonify({"message": "❌ Historique illisible"}), 500
+    
+    return jsonify({
+        "events": [{**e, "text": format_event(game, e)} for e in events],
+        "next_before": next_before
+    })
+
 @app.route("/save")
 def save():
     if 'username' not in session:
@@ -0,0 +1,289 @@
+"""Générateur de charge HTTP pour OpenFront Strategy.
+
+Démarre l'application en local sous gunicorn, inscrit N joueurs synthétiques
+puis joue des sessions réalistes en parallèle (/game, /api/select, /api/attack,
+/api/build_city, /api/next_turn). Affiche le débit, les latences p50/p95/p99
+par route et le taux d'erreurs.
+
+    python loadtest.py --users 50 --concurrency 20 --duration 30 --workers 4
+    python loadtest.py --workers 2 --threads 4 --json resultats.json
+    python loadtest.py --url http://127.0.0.1:5000 --users 10
+"""
+import argparse, http.cookiejar, json, math, os, random, re, socket, subprocess, sys, tempfile, threading, time
+import urllib.error, urllib.parse, urllib.request
+from collections import defaultdict
+
+# Les cases du joueur portent la classe "mine" (sa couleur est aussi celle du premier bot)
+CELL_RE = re.compile(r'<div class="cell ([^"]*)" style="[^"]*" onclick="selectCell\((\d+),(\d+)\)"')
+
+# ================== SERVEUR ==================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(args, data_dir):
+    """Lance gunicorn dans un dossier temporaire (utilisateurs et sauvegardes isolés)"""
+    port = free_port()
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=repo_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    cmd = [sys.executable, "-m", "gunicorn", "app:app",
+           "--bind", f"127.0.0.1:{port}",
+           "--workers", str(args.workers),
+           "--threads", str(args.threads),
+           "--worker-class", args.worker_class,
+           "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=data_dir, env=env)
+    return proc, f"http://127.0.0.1:{port}"
+
+def wait_ready(url, proc=None, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {proc.returncode})")
+        try:
+            urllib.request.urlopen(url + "/", timeout=1).read()
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Serveur injoignable sur {url}")
+
+# ================== MESURES ==================
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values), math.ceil(p / 100 * len(sorted_values))) - 1)
+    return sorted_values[k]
+
+class Stats:
+    """Latences et erreurs par route (thread-safe)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, elapsed, ok):
+        with self.lock:
+            self.latencies[route].append(elapsed)
+            if not ok:
+                self.errors[route] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        total = total_errors = 0
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            count, errors = len(values), self.errors[route]
+            total += count
+            total_errors += errors
+            routes[route] = {
+                "count": count,
+                "errors": errors,
+                "error_rate": errors / count if count else 0.0,
+                "rps": count / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+        return {
+            "elapsed_s": elapsed,
+            "requests": total,
+            "errors": total_errors,
+            "error_rate": total_errors / total if total else 0.0,
+            "rps": total / elapsed if elapsed else 0.0,
+            "routes": routes,
+        }
+
+def print_summary(summary, title):
+    print(f"\n=== {title} ===")
+    print(f"{'route':<22}{'req':>7}{'err':>6}{'err%':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, r in summary["routes"].items():
+        print(f"{route:<22}{r['count']:>7}{r['errors']:>6}{r['error_rate']*100:>6.1f}%{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+    print(f"Total: {summary['requests']} requêtes en {summary['elapsed_s']:.1f}s → "
+          f"{summary['rps']:.1f} req/s, {summary['errors']} erreurs ({summary['error_rate']*100:.2f}%)")
+
+# ================== JOUEUR SYNTHÉTIQUE ==================
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class Player:
+    def __init__(self, base_url, username, password, stats, timeout):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+        self.cells = []
+        self.my_cells = []
+
+    def call(self, method, path, form=None, payload=None, expect=None):
+        """Requête chronométrée ; renvoie (status, corps), ou (None, None) si la requête échoue"""
+        data, headers = None, {}
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif payload is not None:
+            data = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        start = time.perf_counter()
+        status, body = None, None
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                status, body = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        elapsed = time.perf_counter() - start
+        ok = status is not None and (status == expect if expect else status < 400)
+        self.stats.record(f"{method} {path.split('?')[0]}", elapsed, ok)
+        return (status, body) if ok else (None, None)
+
+    def call_json(self, path, payload=None):
+        status, body = self.call("POST", path, payload=payload)
+        if status is None:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    def setup(self):
+        """Inscription, connexion et nouvelle partie sauvegardée"""
+        creds = {"username": self.username, "password": self.password}
+        self.call("POST", "/signup", form=creds, expect=302)
+        if self.call("POST", "/login", form=creds, expect=302)[0] is None:
+            return False
+        return self.call("GET", "/new_game", expect=302)[0] is not None
+
+    def render(self):
+        status, body = self.call("GET", "/game", expect=200)
+        if status is None:
+            return
+        self.cells = [(int(x), int(y), "mine" in classes.split()) for classes, x, y in CELL_RE.findall(body.decode("utf-8", "replace"))]
+        self.my_cells = [(x, y) for x, y, mine in self.cells if mine]
+
+    def targets(self):
+        known = {(x, y) for x, y, _ in self.cells}
+        mine = set(self.my_cells)
+        return sorted({(x + dx, y + dy) for x, y in mine for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]
+                       if (x + dx, y + dy) in known and (x + dx, y + dy) not in mine})
+
+    def play(self, actions, deadline):
+        """Une session : affichage de la carte puis une série d'actions"""
+        self.render()
+        if not self.my_cells:  # Joueur éliminé : nouvelle partie plutôt que des /game en boucle
+            self.call("GET", "/new_game", expect=302)
+            self.render()
+        for i in range(actions):
+            if time.time() >= deadline or not self.my_cells:
+                return
+            roll = random.random()
+            if roll < 0.5:
+                self.attack_step()
+            elif roll < 0.75:
+                self.build_step()
+            else:
+                self.call_json("/api/next_turn")
+                self.render()
+
+    def attack_step(self):
+        targets = self.targets()
+        if not targets:
+            return
+        x, y = random.choice(targets)
+        data = self.call_json("/api/select", {"x": x, "y": y})
+        if not data or data.get("action") != "attack_menu" or data["my_troops"] <= 0:
+            return
+        troops = max(1, int(data["my_troops"] * random.uniform(0.4, 0.9)))
+        self.call_json("/api/attack", {"fx": data["from_x"], "fy": data["from_y"], "tx": x, "ty": y, "troops": troops})
+        self.render()
+
+    def build_step(self):
+        x, y = random.choice(self.my_cells)
+        data = self.call_json("/api/select", {"x": x, "y": y})
+        if data and data.get("action") == "build_menu" and data["player_gold"] >= 300:
+            self.call_json("/api/build_city", {"x": x, "y": y})
+
+# ================== MAIN ==================
+def run(args, base_url):
+    setup_stats, stats = Stats(), Stats()
+    run_id = f"{int(time.time())}{random.randint(100, 999)}"
+    players = [Player(base_url, f"lt{run_id}_{i}", "loadtest", setup_stats, args.timeout) for i in range(args.users)]
+
+    # Inscriptions séquentielles : strategy_users.json est réécrit en entier à chaque inscription
+    start = time.perf_counter()
+    players = [p for p in players if p.setup()]
+    print_summary(setup_stats.summary(time.perf_counter() - start), f"Préparation ({len(players)}/{args.users} joueurs)")
+    if not players:
+        raise RuntimeError("Aucun joueur synthétique n'a pu se connecter")
+
+    for p in players:
+        p.stats = stats
+    concurrency = min(args.concurrency, len(players))
+    deadline = time.time() + args.duration
+
+    def worker(mine):
+        while time.time() < deadline:
+            for p in mine:
+                if time.time() >= deadline:
+                    return
+                p.play(args.actions, deadline)
+
+    threads = [threading.Thread(target=worker, args=(players[i::concurrency],), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    summary = stats.summary(time.perf_counter() - start)
+    config = f"{concurrency} clients" if args.url else \
+        f"{concurrency} clients, gunicorn {args.workers} workers x {args.threads} threads ({args.worker_class})"
+    print_summary(summary, f"Charge ({config})")
+
+    if args.json:
+        summary["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+        json.dump(summary, open(args.json, "w", encoding="utf-8"), indent=2)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge HTTP d'OpenFront Strategy")
+    parser.add_argument("--users", type=int, default=20, help="joueurs synthétiques à inscrire")
+    parser.add_argument("--concurrency", type=int, default=10, help="clients simultanés")
+    parser.add_argument("--duration", type=float, default=30, help="durée de la phase de charge (s)")
+    parser.add_argument("--actions", type=int, default=8, help="actions par session de jeu")
+    parser.add_argument("--timeout", type=float, default=30, help="timeout par requête (s)")
+    parser.add_argument("--workers", type=int, default=1, help="workers gunicorn")
+    parser.add_argument("--threads", type=int, default=1, help="threads par worker gunicorn")
+    parser.add_argument("--worker-class", default="sync", help="classe de worker gunicorn")
+    parser.add_argument("--url", help="cibler un serveur déjà lancé au lieu de démarrer gunicorn")
+    parser.add_argument("--json", help="écrire le résumé dans ce fichier")
+    parser.add_argument("--seed", type=int, help="graine aléatoire des sessions")
+    args = parser.parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.url:
+        base_url = args.url.rstrip("/")
+        wait_ready(base_url)
+        return run(args, base_url)
+
+    with tempfile.TemporaryDirectory(prefix="openfront_loadtest_") as data_dir:
+        proc, base_url = start_server(args, data_dir)
+        try:
+            wait_ready(base_url, proc)
+            return run(args, base_url)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+if __name__ == "__main__":
+    main()